@@ -1,8 +1,16 @@
 import os
 import sys
+import asyncio
+import contextlib
+import heapq
 import re
-from typing import List, Dict
+import signal
+import time
+from functools import lru_cache
+from typing import List, Dict, Optional
 from datetime import datetime
+from itertools import groupby
+from collections import OrderedDict
 
 # Add parent directory to path so we can import from sibling packages
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,13 +20,16 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
+from sqlalchemy import select, insert, delete, func, and_, or_
+from sqlalchemy.orm import aliased
 import logging
 
-from group_database.database import SessionLocal, init_db
-from group_database.models import Group, TelegramUser, Expense, Split
+from settings import settings
+from group_database.database import SessionLocal, init_db, dialect_insert
+from group_database.models import Group, TelegramUser, Expense, Split, group_members
 from fastapi_backend import app as fastapi_app
 import uvicorn
-import threading
+import uvloop
 
 from expense_types.types import ExpenseData
 # Configure logging
@@ -28,57 +39,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Pydantic models for LangChain structured output
+# Max number of (user, chat) registrations remembered to skip redundant DB writes
+REGISTERED_MEMBERS_CACHE_SIZE = 10000
 
+# Seconds a chat's administrator list is reused before asking Telegram again
+ADMINS_CACHE_TTL = 300
 
-class BillSplitBot:
-    def __init__(self, telegram_token: str, openai_api_key: str):
-        self.telegram_token = telegram_token
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            openai_api_key=openai_api_key,
-            temperature=0
-        )
-        self.parser = PydanticOutputParser(pydantic_object=ExpenseData)
-        
-        # Keywords to detect expense-related messages
-        self.expense_keywords = ['split', 'paid', 'expense', 'bill', 'owes', 'owe']
-    
-    def is_expense_message(self, text: str) -> bool:
-        """Check if message is likely about expense splitting"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.expense_keywords)
-    
-    async def parse_expense(self, text: str) -> ExpenseData:
-        """Parse natural language expense using LangChain and OpenAI"""
-        prompt = PromptTemplate(
-            template="""You are a bill splitting assistant. Parse the following expense message and extract structured information.
+# Keywords to detect expense-related messages
+EXPENSE_KEYWORDS = ['split', 'paid', 'expense', 'bill', 'owes', 'owe']
+# Single case-insensitive pass over the message instead of one scan per keyword
+EXPENSE_RE = re.compile('|'.join(map(re.escape, EXPENSE_KEYWORDS)), re.IGNORECASE)
 
-Rules:
-1. Extract the total amount of the expense
-2. Identify all participants (usernames mentioned with @)
-3. If individual amounts paid are mentioned, extract them (is_equal_split=False)
-4. If no individual amounts mentioned, it's an equal split (is_equal_split=True)
-5. Extract any description about what the expense is for
-6. Remove @ symbol from usernames
+# Texts up to this length are cheaper to scan than to hash into the cache
+EXPENSE_CACHE_MIN_LENGTH = 64
 
-{format_instructions}
 
-Message: {message}
+@lru_cache(maxsize=2048)
+def _is_expense_cached(text: str) -> bool:
+    return EXPENSE_RE.search(text) is not None
 
-Parse the expense:""",
-            input_variables=["message"],
-            partial_variables={"format_instructions": self.parser.get_format_instructions()}
-        )
-        
-        chain = prompt | self.llm | self.parser
-        result = await chain.ainvoke({"message": text})
-        return result
 
-    
-    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /start command"""
-        welcome_message = """
+# Seconds Telegram holds a getUpdates long poll open when there are no new messages
+POLLING_TIMEOUT = 20
+
+# Signals that shut the bot (and the embedded API) down cleanly
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGABRT)
+
+# Reply to /start and /help
+WELCOME_MESSAGE = """
 👋 Welcome to Bill Splitting Bot!
 
 I help you split bills and track expenses in your group.
@@ -105,486 +93,570 @@ I help you split bills and track expenses in your group.
 
 Start splitting bills! 💰
 """
-        await update.message.reply_text(welcome_message, parse_mode='Markdown')
+
+# Prompt for LangChain structured output
+EXPENSE_PROMPT_TEMPLATE = """You are a bill splitting assistant. Parse the following expense message and extract structured information.
+
+Rules:
+1. Extract the total amount of the expense
+2. Identify all participants (usernames mentioned with @)
+3. If individual amounts paid are mentioned, extract them (is_equal_split=False)
+4. If no individual amounts mentioned, it's an equal split (is_equal_split=True)
+5. Extract any description about what the expense is for
+6. Remove @ symbol from usernames
+
+{format_instructions}
+
+Message: {message}
+
+Parse the expense:"""
+
+
+class BillSplitBot:
+    def __init__(self, telegram_token: str, openai_api_key: str):
+        self.telegram_token = telegram_token
+        self.llm = ChatOpenAI(
+            model="gpt-4o-mini",
+            openai_api_key=openai_api_key,
+            temperature=0
+        )
+        self.parser = PydanticOutputParser(pydantic_object=ExpenseData)
+        
+        # The prompt only depends on the static ExpenseData schema, so build it and the chain once
+        self._format_instructions = self.parser.get_format_instructions()
+        self._prompt = PromptTemplate(
+            template=EXPENSE_PROMPT_TEMPLATE,
+            input_variables=["message"],
+            partial_variables={"format_instructions": self._format_instructions}
+        )
+        self._chain = self._prompt | self.llm | self.parser
+        
+        self.expense_keywords = EXPENSE_KEYWORDS
+        
+        # LRU of (telegram user id, chat id) -> profile already registered by this process
+        self._registered_members = OrderedDict()
+        
+        # chat id -> (fetched at, administrators by lowercase username)
+        self._admins_cache = {}
+    
+    def is_expense_message(self, text: str) -> bool:
+        """Check if message is likely about expense splitting"""
+        if len(text) > EXPENSE_CACHE_MIN_LENGTH:
+            # Long messages are often re-delivered (edits, forwards), so remember their result
+            return _is_expense_cached(text)
+        return EXPENSE_RE.search(text) is not None
+    
+    async def parse_expense(self, text: str) -> ExpenseData:
+        """Parse natural language expense using LangChain and OpenAI"""
+        return await self._chain.ainvoke({"message": text})
+
+    
+    async def _get_admins_by_username(self, chat) -> Dict[str, User]:
+        """Get the chat's administrators keyed by lowercase username, cached per chat"""
+        cached = self._admins_cache.get(chat.id)
+        if cached and time.monotonic() - cached[0] < ADMINS_CACHE_TTL:
+            return cached[1]
+        
+        admins = await chat.get_administrators()
+        admins_by_username = {admin.user.username.lower(): admin.user for admin in admins if admin.user.username}
+        self._admins_cache[chat.id] = (time.monotonic(), admins_by_username)
+        return admins_by_username
+    
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /start command"""
+        await update.message.reply_text(WELCOME_MESSAGE, parse_mode='Markdown')
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
         await self.start(update, context)
     
+    async def _run_db(self, fn, *args):
+        """Run a blocking database function in a worker thread so the event loop stays free"""
+        def call():
+            db = SessionLocal()
+            try:
+                return fn(db, *args)
+            finally:
+                db.close()
+        
+        return await asyncio.to_thread(call)
+    
     async def balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user's balance with each person"""
-        db = SessionLocal()
-        try:
-            user_id = update.effective_user.id
-            chat_id = update.effective_chat.id
-            
-            # Get user from DB
-            user = db.query(TelegramUser).filter_by(telegram_id=user_id).first()
-            if not user:
-                await update.message.reply_text("You don't have any expenses yet!")
-                return
-            
-            # Calculate balances
-            balances = self._calculate_user_balances(db, user_id, chat_id)
-            
-            if not balances:
-                await update.message.reply_text("You're all settled up! 🎉")
-                return
-            
-            message = "💰 *Your Balances:*\n\n"
-            for other_user, amount in balances.items():
-                if amount > 0:
-                    message += f"• @{other_user} owes you: ₹{amount:.2f}\n"
-                elif amount < 0:
-                    message += f"• You owe @{other_user}: ₹{abs(amount):.2f}\n"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        user_id = update.effective_user.id
+        chat_id = update.effective_chat.id
+        
+        # Calculate balances (None if the user isn't in our DB)
+        balances = await self._run_db(self._user_balances, user_id, chat_id)
+        if balances is None:
+            await update.message.reply_text("You don't have any expenses yet!")
+            return
+        
+        if not balances:
+            await update.message.reply_text("You're all settled up! 🎉")
+            return
+        
+        parts = ["💰 *Your Balances:*\n\n"]
+        for other_user, amount in balances.items():
+            if amount > 0:
+                parts.append(f"• @{other_user} owes you: ₹{amount:.2f}\n")
+            elif amount < 0:
+                parts.append(f"• You owe @{other_user}: ₹{abs(amount):.2f}\n")
+        
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
+    
+    def _user_balances(self, db, user_id: int, chat_id: int) -> Optional[Dict[str, float]]:
+        """Get user from DB and calculate their balances, None if they aren't registered"""
+        if db.scalar(select(TelegramUser.id).where(TelegramUser.telegram_id == user_id)) is None:
+            return None
+        
+        return self._calculate_user_balances(db, user_id, chat_id)
     
     def _calculate_user_balances(self, db, user_id: int, chat_id: int) -> Dict[str, float]:
         """Calculate net balances between users"""
-        balances = {}
+        # One row per (expense, other participant) for every expense this user
+        # split in this group, carrying this user's net (paid - owed) share with
+        # that participant
+        other_split = aliased(Split)
+        shares = (
+            select(
+                TelegramUser.username.label("username"),
+                ((Split.paid_amount - Split.owed_amount)
+                 / (Expense.participant_count - 1)).label("share"),
+            )
+            .join(Expense, Expense.id == Split.expense_id)
+            .join(Group, Group.id == Expense.group_id)
+            .join(other_split, and_(
+                other_split.expense_id == Split.expense_id,
+                other_split.user_id != Split.user_id,
+            ))
+            .join(TelegramUser, TelegramUser.id == other_split.user_id)
+            .where(Group.telegram_chat_id == chat_id, Split.user_id == user_id)
+            .subquery()
+        )
         
-        # Get all splits involving this user in this group
-        splits = db.query(Split).join(Expense).join(Group).filter(
-            Group.telegram_chat_id == chat_id,
-            Split.user_id == user_id
+        # Sum the shares per person in the database rather than in a Python loop
+        balances = db.execute(
+            select(shares.c.username, func.sum(shares.c.share))
+            .group_by(shares.c.username)
+            .order_by(shares.c.username)
         ).all()
         
-        for split in splits:
-            expense = split.expense
-            # Find what this user paid
-            user_paid = next((s.paid_amount for s in expense.splits if s.user_id == user_id), 0)
-            
-            # Calculate with each other participant
-            for other_split in expense.splits:
-                if other_split.user_id != user_id:
-                    other_user = db.query(TelegramUser).get(other_split.user_id)
-                    username = other_user.username
-                    
-                    # Net amount: what I paid - what I owe
-                    net = user_paid - split.owed_amount
-                    
-                    if username not in balances:
-                        balances[username] = 0
-                    balances[username] += net / (len(expense.splits) - 1)
-        
-        return {k: v for k, v in balances.items() if abs(v) > 0.01}
+        return {username: amount for username, amount in balances if abs(amount) > 0.01}
     
     def _simplify_debts(self, db, chat_id: int) -> List[Dict]:
         """Simplify all debts in a group using debt simplification algorithm"""
         # Get all users in the group
-        group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-        if not group:
+        group_id = db.scalar(select(Group.id).where(Group.telegram_chat_id == chat_id))
+        if group_id is None:
             return []
         
-        # Calculate net balance for each user
-        user_balances = {}  # {user_id: net_balance}
-        
-        expenses = db.query(Expense).filter_by(group_id=group.id).all()
-        
-        for expense in expenses:
-            for split in expense.splits:
-                user_id = split.user_id
-                if user_id not in user_balances:
-                    user_balances[user_id] = 0
-                # Net: what they paid minus what they owe
-                user_balances[user_id] += split.paid_amount - split.owed_amount
-        
-        # Separate creditors (positive balance) and debtors (negative balance)
+        # Calculate net balance for each user: what they paid minus what they owe
+        user_balances = dict(db.execute(
+            select(Split.user_id, func.sum(Split.paid_amount - Split.owed_amount))
+            .join(Expense, Expense.id == Split.expense_id)
+            .where(Expense.group_id == group_id)
+            .group_by(Split.user_id)
+            .order_by(Split.user_id)
+        ).all())  # {user_id: net_balance}
+        
+        # Resolve usernames only for users who still owe or are owed money
+        unsettled_ids = [user_id for user_id, balance in user_balances.items() if abs(balance) > 0.01]
+        usernames = dict(db.execute(
+            select(TelegramUser.id, TelegramUser.username).where(TelegramUser.id.in_(unsettled_ids))
+        ).all()) if unsettled_ids else {}
+        
+        # Separate creditors (positive balance) and debtors (negative balance) into
+        # max-heaps keyed on the amount still outstanding (stored negated for heapq)
         creditors = []  # People who should receive money
         debtors = []    # People who should pay money
         
         for user_id, balance in user_balances.items():
             if balance > 0.01:  # Creditor
-                user = db.query(TelegramUser).get(user_id)
-                creditors.append({"user_id": user_id, "username": user.username, "amount": balance})
+                creditors.append((-balance, user_id, usernames[user_id]))
             elif balance < -0.01:  # Debtor
-                user = db.query(TelegramUser).get(user_id)
-                debtors.append({"user_id": user_id, "username": user.username, "amount": -balance})
+                debtors.append((balance, user_id, usernames[user_id]))
         
-        # Sort for optimal matching
-        creditors.sort(key=lambda x: x["amount"], reverse=True)
-        debtors.sort(key=lambda x: x["amount"], reverse=True)
+        heapq.heapify(creditors)
+        heapq.heapify(debtors)
         
-        # Greedy algorithm to minimize transactions
+        # Greedy algorithm to minimize transactions: always settle the largest
+        # debtor against the largest creditor
         transactions = []
-        i, j = 0, 0
         
-        while i < len(debtors) and j < len(creditors):
-            debtor = debtors[i]
-            creditor = creditors[j]
+        while debtors and creditors:
+            debt, debtor_id, debtor_name = heapq.heappop(debtors)
+            credit, creditor_id, creditor_name = heapq.heappop(creditors)
             
             # Amount to settle
-            amount = min(debtor["amount"], creditor["amount"])
-            
-            if amount > 0.01:  # Only add if meaningful
-                transactions.append({
-                    "from": debtor["username"],
-                    "to": creditor["username"],
-                    "amount": round(amount, 2)
-                })
-            
-            # Update remaining amounts
-            debtor["amount"] -= amount
-            creditor["amount"] -= amount
-            
-            # Move to next if settled
-            if debtor["amount"] < 0.01:
-                i += 1
-            if creditor["amount"] < 0.01:
-                j += 1
+            amount = min(-debt, -credit)
+            transactions.append({
+                "from": debtor_name,
+                "to": creditor_name,
+                "amount": round(amount, 2)
+            })
+            
+            # Push back whoever still has a meaningful amount left
+            if -debt - amount > 0.01:
+                heapq.heappush(debtors, (debt + amount, debtor_id, debtor_name))
+            if -credit - amount > 0.01:
+                heapq.heappush(creditors, (credit + amount, creditor_id, creditor_name))
         
         return transactions
     
     async def summary(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show group expense summary"""
-        db = SessionLocal()
-        try:
-            chat_id = update.effective_chat.id
-            
-            # Get group from DB
-            group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-            if not group:
-                await update.message.reply_text("No expenses recorded for this group yet!")
-                return
-            
-            expenses = db.query(Expense).filter_by(group_id=group.id).order_by(Expense.created_at.desc()).limit(10).all()
-            
-            if not expenses:
-                await update.message.reply_text("No expenses recorded yet!")
-                return
-            
-            message = "📊 *Recent Expenses:*\n\n"
-            total = 0
-            
-            for exp in expenses:
-                participants = [f"@{db.query(TelegramUser).get(s.user_id).username}" for s in exp.splits]
-                message += f"• ₹{exp.amount:.2f} - {exp.description or 'No description'}\n"
-                message += f"  👥 {', '.join(participants)}\n"
-                message += f"  📅 {exp.created_at.strftime('%d %b %Y')}\n\n"
-                total += exp.amount
-            
-            message += f"*Total: ₹{total:.2f}*"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        chat_id = update.effective_chat.id
+        
+        rows = await self._run_db(self._recent_expense_rows, chat_id)
+        if rows is None:
+            await update.message.reply_text("No expenses recorded for this group yet!")
+            return
+        
+        if not rows:
+            await update.message.reply_text("No expenses recorded yet!")
+            return
+        
+        parts = ["📊 *Recent Expenses:*\n\n"]
+        total = 0
+        
+        for (_, amount, description, created_at), exp_rows in groupby(rows, key=lambda row: row[:4]):
+            participants = ", ".join(f"@{row.username}" for row in exp_rows if row.username is not None)
+            parts.append(
+                f"• ₹{amount:.2f} - {description or 'No description'}\n"
+                f"  👥 {participants}\n"
+                f"  📅 {created_at.strftime('%d %b %Y')}\n\n"
+            )
+            total += amount
+        
+        parts.append(f"*Total: ₹{total:.2f}*")
+        
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
+    
+    def _recent_expense_rows(self, db, chat_id: int):
+        """Get the group's last 10 expenses, one row per participant (None if no group)"""
+        group_id = db.scalar(select(Group.id).where(Group.telegram_chat_id == chat_id))
+        if group_id is None:
+            return None
+        
+        # Last 10 expenses joined with their participants' usernames in one query
+        recent = (
+            select(Expense.id)
+            .where(Expense.group_id == group_id)
+            .order_by(Expense.created_at.desc(), Expense.id.desc())
+            .limit(10)
+            .subquery()
+        )
+        return db.execute(
+            select(Expense.id, Expense.amount, Expense.description, Expense.created_at, TelegramUser.username)
+            .join(recent, recent.c.id == Expense.id)
+            .outerjoin(Split, Split.expense_id == Expense.id)
+            .outerjoin(TelegramUser, TelegramUser.id == Split.user_id)
+            .order_by(Expense.created_at.desc(), Expense.id.desc(), Split.id)
+        ).all()
     
     async def my_expenses(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user's recent expenses"""
-        db = SessionLocal()
-        try:
-            user_id = update.effective_user.id
-            chat_id = update.effective_chat.id
-            
-            user = db.query(TelegramUser).filter_by(telegram_id=user_id).first()
-            if not user:
-                await update.message.reply_text("You don't have any expenses yet!")
-                return
-            
-            # Get expenses where user participated
-            expenses = db.query(Expense).join(Split).join(Group).filter(
-                Split.user_id == user.id,
-                Group.telegram_chat_id == chat_id
-            ).order_by(Expense.created_at.desc()).limit(10).all()
-            
-            if not expenses:
-                await update.message.reply_text("You don't have any expenses yet!")
-                return
-            
-            message = "📝 *Your Recent Expenses:*\n\n"
-            
-            for exp in expenses:
-                user_split = next(s for s in exp.splits if s.user_id == user.id)
-                message += f"• ₹{exp.amount:.2f} - {exp.description or 'No description'}\n"
-                message += f"  You paid: ₹{user_split.paid_amount:.2f} | You owe: ₹{user_split.owed_amount:.2f}\n"
-                message += f"  📅 {exp.created_at.strftime('%d %b %Y')}\n\n"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        user_id = update.effective_user.id
+        chat_id = update.effective_chat.id
+        
+        expenses = await self._run_db(self._user_recent_expenses, user_id, chat_id)
+        if not expenses:
+            await update.message.reply_text("You don't have any expenses yet!")
+            return
+        
+        parts = ["📝 *Your Recent Expenses:*\n\n"]
+        
+        for amount, description, created_at, paid_amount, owed_amount in expenses:
+            parts.append(
+                f"• ₹{amount:.2f} - {description or 'No description'}\n"
+                f"  You paid: ₹{paid_amount:.2f} | You owe: ₹{owed_amount:.2f}\n"
+                f"  📅 {created_at.strftime('%d %b %Y')}\n\n"
+            )
+        
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
+    
+    def _user_recent_expenses(self, db, user_id: int, chat_id: int) -> List[tuple]:
+        """Get (amount, description, created_at, paid, owed) for the user's last 10 expenses"""
+        # Expenses where user participated, with their own split alongside
+        return db.execute(
+            select(Expense.amount, Expense.description, Expense.created_at, Split.paid_amount, Split.owed_amount)
+            .join(Split, Split.expense_id == Expense.id)
+            .join(TelegramUser, TelegramUser.id == Split.user_id)
+            .join(Group, Group.id == Expense.group_id)
+            .where(TelegramUser.telegram_id == user_id, Group.telegram_chat_id == chat_id)
+            .order_by(Expense.created_at.desc())
+            .limit(10)
+        ).all()
     
     async def group_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show group statistics"""
-        db = SessionLocal()
-        try:
-            chat_id = update.effective_chat.id
-            
-            group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-            if not group:
-                await update.message.reply_text("No expenses recorded for this group yet!")
-                return
-            
-            expenses = db.query(Expense).filter_by(group_id=group.id).all()
-            
-            if not expenses:
-                await update.message.reply_text("No expenses recorded yet!")
-                return
-            
-            total_amount = sum(exp.amount for exp in expenses)
-            total_expenses = len(expenses)
-            avg_expense = total_amount / total_expenses
-            
-            message = f"""📈 *Group Statistics:*
+        chat_id = update.effective_chat.id
+        
+        stats = await self._run_db(self._group_totals, chat_id)
+        if stats is None:
+            await update.message.reply_text("No expenses recorded for this group yet!")
+            return
+        
+        group_name, total_expenses, total_amount = stats
+        if not total_expenses:
+            await update.message.reply_text("No expenses recorded yet!")
+            return
+        
+        avg_expense = total_amount / total_expenses
+        
+        message = f"""📈 *Group Statistics:*
 
 💰 Total Amount: ₹{total_amount:.2f}
 📊 Total Expenses: {total_expenses}
 📉 Average Expense: ₹{avg_expense:.2f}
-👥 Group Name: {group.name or 'Unnamed Group'}
+👥 Group Name: {group_name or 'Unnamed Group'}
 """
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    def _group_totals(self, db, chat_id: int):
+        """Get (group name, expense count, total amount) for a chat, None if no group"""
+        return db.execute(
+            select(Group.name, func.count(Expense.id), func.coalesce(func.sum(Expense.amount), 0))
+            .outerjoin(Expense, Expense.group_id == Group.id)
+            .where(Group.telegram_chat_id == chat_id)
+            .group_by(Group.id, Group.name)
+        ).first()
     
     async def simplify_payments(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show simplified payment plan for the group"""
-        db = SessionLocal()
-        try:
-            chat_id = update.effective_chat.id
-            
-            # Get simplified transactions
-            transactions = self._simplify_debts(db, chat_id)
-            
-            if not transactions:
-                await update.message.reply_text("🎉 Everyone is settled up! No payments needed.")
-                return
-            
-            message = "💸 *Simplified Payment Plan:*\n\n"
-            message += "To settle all debts with minimum transactions:\n\n"
-            
-            for i, txn in enumerate(transactions, 1):
-                message += f"{i}. @{txn['from']} pays @{txn['to']}: ₹{txn['amount']:.2f}\n"
-            
-            message += f"\n✨ Only {len(transactions)} transaction(s) needed!"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        chat_id = update.effective_chat.id
+        
+        # Get simplified transactions
+        transactions = await self._run_db(self._simplify_debts, chat_id)
+        
+        if not transactions:
+            await update.message.reply_text("🎉 Everyone is settled up! No payments needed.")
+            return
+        
+        parts = ["💸 *Simplified Payment Plan:*\n\nTo settle all debts with minimum transactions:\n\n"]
+        
+        for i, txn in enumerate(transactions, 1):
+            parts.append(f"{i}. @{txn['from']} pays @{txn['to']}: ₹{txn['amount']:.2f}\n")
+        
+        parts.append(f"\n✨ Only {len(transactions)} transaction(s) needed!")
+        
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
     
     async def list_members(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """List all registered members in this group"""
-        db = SessionLocal()
-        try:
-            chat_id = update.effective_chat.id
-            
-            # Get group
-            group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-            if not group:
-                await update.message.reply_text("No members registered yet! Send any message to register yourself.")
-                return
-            
-            # Get all members from the group_members relationship
-            members = group.members
-            
-            if not members:
-                await update.message.reply_text("No members registered yet! Send any message to register yourself.")
-                return
-            
-            message = "👥 *Registered Members in this Group:*\n\n"
-            
-            for user in members:
-                name = user.first_name or user.username
-                message += f"• @{user.username} ({name})\n"
-            
-            message += f"\n📊 Total: {len(members)} member(s)"
-            message += "\n\n💡 *Tip:* Any user mentioned in an expense must be a member of this group. Ask them to send any message in this group to register!"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-        finally:
-            db.close()
+        chat_id = update.effective_chat.id
+        
+        members = await self._run_db(self._group_member_names, chat_id)
+        
+        if not members:
+            await update.message.reply_text("No members registered yet! Send any message to register yourself.")
+            return
+        
+        parts = ["👥 *Registered Members in this Group:*\n\n"]
+        
+        for username, first_name in members:
+            name = first_name or username
+            parts.append(f"• @{username} ({name})\n")
+        
+        parts.append(
+            f"\n📊 Total: {len(members)} member(s)"
+            "\n\n💡 *Tip:* Any user mentioned in an expense must be a member of this group. Ask them to send any message in this group to register!"
+        )
+        
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
+    
+    def _group_member_names(self, db, chat_id: int) -> List[tuple]:
+        """Get (username, first_name) for every registered member of the group"""
+        group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
+        if not group:
+            return []
+        
+        # Get all members from the group_members relationship
+        return [(user.username, user.first_name) for user in group.members]
     
     async def register_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Register the user in the system"""
-        db = SessionLocal()
-        try:
-            sender = update.effective_user
-            chat_id = update.effective_chat.id
-            chat_title = update.effective_chat.title or "Private Chat"
-            
-            # Get or create user
-            user = db.query(TelegramUser).filter_by(telegram_id=sender.id).first()
-            
-            if not user:
-                user = TelegramUser(
-                    telegram_id=sender.id,
-                    username=sender.username or f"user_{sender.id}",
-                    first_name=sender.first_name,
-                    last_name=sender.last_name
-                )
-                db.add(user)
-                db.commit()
-                db.refresh(user)
-            
-            # Get or create group
-            group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-            if not group:
-                group = Group(telegram_chat_id=chat_id, name=chat_title)
-                db.add(group)
-                db.commit()
-                db.refresh(group)
-            
-            # Add user to group if not already a member
-            if user not in group.members:
-                group.members.append(user)
-                db.commit()
-                await update.message.reply_text(
-                    f"✅ Welcome @{user.username}! You're now registered in {group.name} and can be mentioned in expenses."
-                )
-            else:
-                await update.message.reply_text(
-                    f"✅ You're already registered as @{user.username} in {group.name}!"
-                )
-            
-        finally:
-            db.close()
+        sender = update.effective_user
+        chat_id = update.effective_chat.id
+        chat_title = update.effective_chat.title or "Private Chat"
+        
+        username, group_name, newly_added = await self._run_db(self._register_user, sender, chat_id, chat_title)
+        
+        if newly_added:
+            await update.message.reply_text(
+                f"✅ Welcome @{username}! You're now registered in {group_name} and can be mentioned in expenses."
+            )
+        else:
+            await update.message.reply_text(
+                f"✅ You're already registered as @{username} in {group_name}!"
+            )
+    
+    def _register_user(self, db, sender: User, chat_id: int, chat_title: str):
+        """Get or create the user and group, returning (username, group name, newly added)"""
+        # Get or create user
+        user = db.query(TelegramUser).filter_by(telegram_id=sender.id).first()
+        
+        if not user:
+            user = TelegramUser(
+                telegram_id=sender.id,
+                username=sender.username or f"user_{sender.id}",
+                first_name=sender.first_name,
+                last_name=sender.last_name
+            )
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+        
+        # Get or create group
+        group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
+        if not group:
+            group = Group(telegram_chat_id=chat_id, name=chat_title)
+            db.add(group)
+            db.commit()
+            db.refresh(group)
+        
+        # Add user to group if not already a member
+        if user in group.members:
+            return user.username, group.name, False
+        
+        group.members.append(user)
+        db.commit()
+        return user.username, group.name, True
+    
+    def _register_sender(self, db, sender: User, chat_id: int, chat_title: str):
+        """Create or update the sender and add them to the group's members"""
+        # Upsert the user, only overwriting profile fields Telegram sent that changed
+        user_insert = dialect_insert(TelegramUser).values(
+            telegram_id=sender.id,
+            username=sender.username or f"user_{sender.id}",
+            first_name=sender.first_name,
+            last_name=sender.last_name
+        )
+        changed_fields = [field for field in ("username", "first_name", "last_name") if getattr(sender, field)]
+        if changed_fields:
+            user_insert = user_insert.on_conflict_do_update(
+                index_elements=[TelegramUser.telegram_id],
+                set_={field: user_insert.excluded[field] for field in changed_fields},
+                where=or_(*(
+                    getattr(TelegramUser, field).is_distinct_from(user_insert.excluded[field])
+                    for field in changed_fields
+                ))
+            )
+        else:
+            user_insert = user_insert.on_conflict_do_nothing(index_elements=[TelegramUser.telegram_id])
+        db.execute(user_insert)
+        
+        # Create the group if this is its first message
+        db.execute(
+            dialect_insert(Group)
+            .values(telegram_chat_id=chat_id, name=chat_title)
+            .on_conflict_do_nothing(index_elements=[Group.telegram_chat_id])
+        )
+        
+        # Add user to group if not already a member
+        membership = db.execute(
+            dialect_insert(group_members)
+            .values(
+                group_id=select(Group.id).where(Group.telegram_chat_id == chat_id).scalar_subquery(),
+                user_id=select(TelegramUser.id).where(TelegramUser.telegram_id == sender.id).scalar_subquery()
+            )
+            .on_conflict_do_nothing()
+        )
+        db.commit()
+        
+        if membership.rowcount:
+            logger.info(f"Added user @{sender.username or f'user_{sender.id}'} to group {chat_title} ({chat_id})")
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages and parse expenses"""
         message_text = update.message.text
         
-        # First, register/update the user in our database AND track group membership
-        db = SessionLocal()
-        try:
-            sender = update.effective_user
-            chat_id = update.effective_chat.id
-            chat_title = update.effective_chat.title or "Private Chat"
-            
-            # Get or create user
-            user = db.query(TelegramUser).filter_by(telegram_id=sender.id).first()
-            
-            if not user:
-                # New user - register them
-                user = TelegramUser(
-                    telegram_id=sender.id,
-                    username=sender.username or f"user_{sender.id}",
-                    first_name=sender.first_name,
-                    last_name=sender.last_name
-                )
-                db.add(user)
-                db.commit()
-                db.refresh(user)
-            else:
-                # Update user info if changed
-                updated = False
-                if sender.username and user.username != sender.username:
-                    user.username = sender.username
-                    updated = True
-                if sender.first_name and user.first_name != sender.first_name:
-                    user.first_name = sender.first_name
-                    updated = True
-                if sender.last_name and user.last_name != sender.last_name:
-                    user.last_name = sender.last_name
-                    updated = True
-                if updated:
-                    db.commit()
-            
-            # Get or create group
-            group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-            if not group:
-                group = Group(telegram_chat_id=chat_id, name=chat_title)
-                db.add(group)
-                db.commit()
-                db.refresh(group)
-            
-            # Add user to group if not already a member
-            if user not in group.members:
-                group.members.append(user)
-                db.commit()
-                logger.info(f"Added user @{user.username} to group {group.name} ({chat_id})")
-                
-        finally:
-            db.close()
+        # First, register/update the user in our database AND track group membership,
+        # skipping the database when this process already wrote the same profile
+        sender = update.effective_user
+        chat_id = update.effective_chat.id
+        member_key = (sender.id, chat_id)
+        profile = (sender.username, sender.first_name, sender.last_name)
+        
+        if self._registered_members.get(member_key) != profile:
+            await self._run_db(self._register_sender, sender, chat_id, update.effective_chat.title or "Private Chat")
+            self._registered_members[member_key] = profile
+            if len(self._registered_members) > REGISTERED_MEMBERS_CACHE_SIZE:
+                self._registered_members.popitem(last=False)
+        else:
+            self._registered_members.move_to_end(member_key)
         
         # Ignore if not expense-related to save AI costs
         if not self.is_expense_message(message_text):
             return
         
-        db = SessionLocal()
         try:
             # Parse expense using AI
             expense_data = await self.parse_expense(message_text)
             
             # Validate and create expense
-            await self._create_expense(db, update, expense_data)
+            await self._create_expense(update, expense_data)
             
         except ValueError as e:
             await update.message.reply_text(str(e))
         except Exception as e:
             logger.error(f"Error parsing expense: {e}")
             await update.message.reply_text("❌ Sorry, I couldn't understand that expense. Please try again or use /help for examples.")
-        finally:
-            db.close()
     
-    async def _create_expense(self, db, update: Update, expense_data: ExpenseData):
+    async def _create_expense(self, update: Update, expense_data: ExpenseData):
         """Create expense in database after validation"""
         chat_id = update.effective_chat.id
         chat_title = update.effective_chat.title or "Private Chat"
         
-        # Get or create group
-        group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
-        if not group:
-            group = Group(telegram_chat_id=chat_id, name=chat_title)
-            db.add(group)
-            db.commit()
-        
-        # Validate participants are in THIS group
-        telegram_users = []
+        # Validate participants are in THIS group; only plain ids and names leave the
+        # worker threads, so nothing here touches an ORM session on the event loop
+        user_ids = []
         not_found_users = []
         
-        for participant in expense_data.participants:
-            username = participant.username.lstrip('@')
-            
+        # Normalize each participant's username once; it is reused for lookups below
+        usernames = []
+        for p in expense_data.participants:
+            username = p.username.removeprefix('@')
+            usernames.append((username, username.lower()))
+        
+        # Look up every mentioned user in one query instead of one per participant
+        mentioned = {username for username, username_lower in usernames if username_lower != 'me'}
+        group_id, group_name, member_ids, users_by_username = await self._run_db(
+            self._load_expense_context, chat_id, chat_title, mentioned
+        )
+        admins_by_username = None
+        
+        for username, username_lower in usernames:
             # Special case: "me" refers to the message sender
-            if username.lower() == 'me':
-                sender = update.effective_user
-                user = db.query(TelegramUser).filter_by(telegram_id=sender.id).first()
-                if not user:
-                    user = TelegramUser(
-                        telegram_id=sender.id,
-                        username=sender.username or f"user_{sender.id}",
-                        first_name=sender.first_name,
-                        last_name=sender.last_name
-                    )
-                    db.add(user)
-                    db.commit()
-                    db.refresh(user)
-                    # Add to group if not already a member
-                    if user not in group.members:
-                        group.members.append(user)
-                        db.commit()
-                telegram_users.append(user)
+            if username_lower == 'me':
+                user_ids.append(await self._run_db(self._get_or_create_sender, group_id, update.effective_user))
                 continue
             
             # Try to find user in database first
-            user = db.query(TelegramUser).filter_by(username=username).first()
+            user = users_by_username.get(username)
             
             if user:
+                user_id, telegram_id = user
                 # CRITICAL: Check if user is a member of THIS group in our database
-                if user not in group.members:
-                    logger.warning(f"User @{username} (ID: {user.telegram_id}) is in DB but not a member of group {group.name} ({chat_id})")
+                if user_id not in member_ids:
+                    logger.warning(f"User @{username} (ID: {telegram_id}) is in DB but not a member of group {group_name} ({chat_id})")
                     not_found_users.append(username)
                     continue
                 
                 # Double-check: Verify user is still in the Telegram chat
                 try:
-                    member = await update.effective_chat.get_member(user.telegram_id)
+                    member = await update.effective_chat.get_member(telegram_id)
                     if member.status in ['left', 'kicked', 'banned']:
-                        logger.warning(f"User @{username} has left/kicked from group {group.name} ({chat_id})")
+                        logger.warning(f"User @{username} has left/kicked from group {group_name} ({chat_id})")
                         # Remove from our group membership
-                        group.members.remove(user)
-                        db.commit()
+                        await self._run_db(self._remove_member, group_id, user_id)
+                        member_ids.discard(user_id)
+                        self._registered_members.pop((telegram_id, chat_id), None)
                         not_found_users.append(username)
                         continue
-                    telegram_users.append(user)
+                    user_ids.append(user_id)
                 except Exception as e:
                     # User not in this Telegram chat
                     logger.warning(f"User @{username} not in Telegram chat {chat_id}: {e}")
@@ -593,31 +665,19 @@ Start splitting bills! 💰
             else:
                 # User not in our database, try to find them in the chat
                 try:
-                    # Try to get chat administrators (they're usually in the group)
-                    admins = await update.effective_chat.get_administrators()
-                    found = False
-                    
-                    for admin in admins:
-                        if admin.user.username and admin.user.username.lower() == username.lower():
-                            # Found the user - add them to DB and group
-                            user = TelegramUser(
-                                telegram_id=admin.user.id,
-                                username=admin.user.username,
-                                first_name=admin.user.first_name,
-                                last_name=admin.user.last_name
-                            )
-                            db.add(user)
-                            db.commit()
-                            db.refresh(user)
-                            # Add to group
-                            group.members.append(user)
-                            db.commit()
-                            telegram_users.append(user)
-                            found = True
-                            logger.info(f"Auto-registered admin @{username} to group {group.name}")
-                            break
+                    # Try chat administrators (they're usually in the group), fetched once per expense
+                    if admins_by_username is None:
+                        admins_by_username = await self._get_admins_by_username(update.effective_chat)
+                    admin_user = admins_by_username.get(username_lower)
                     
-                    if not found:
+                    if admin_user:
+                        # Found the user - add them to DB and group
+                        user_id = await self._run_db(self._add_admin_member, group_id, admin_user)
+                        member_ids.add(user_id)
+                        users_by_username[username] = (user_id, admin_user.id)
+                        user_ids.append(user_id)
+                        logger.info(f"Auto-registered admin @{username} to group {group_name}")
+                    else:
                         not_found_users.append(username)
                         
                 except Exception as e:
@@ -638,37 +698,12 @@ Start splitting bills! 💰
             if abs(total_paid - expense_data.total_amount) > 0.01:
                 raise ValueError(f"Individual amounts ({total_paid}) don't add up to total ({expense_data.total_amount})!")
         
-        # Create expense
-        expense = Expense(
-            group_id=group.id,
-            amount=expense_data.total_amount,
-            description=expense_data.description,
-            created_by=update.effective_user.id
-        )
-        db.add(expense)
-        db.commit()
-        
-        # Create splits
+        # Create expense and splits
         num_participants = len(expense_data.participants)
         equal_share = expense_data.total_amount / num_participants
-        
-        for i, participant in enumerate(expense_data.participants):
-            user = telegram_users[i]
-            
-            if expense_data.is_equal_split:
-                paid_amount = equal_share
-            else:
-                paid_amount = participant.paid or 0
-            
-            split = Split(
-                expense_id=expense.id,
-                user_id=user.id,
-                paid_amount=paid_amount,
-                owed_amount=equal_share
-            )
-            db.add(split)
-        
-        db.commit()
+        await self._run_db(
+            self._save_expense, group_id, expense_data, user_ids, equal_share, update.effective_user.id
+        )
         
         # Send confirmation
         participants_str = ", ".join([f"@{p.username}" for p in expense_data.participants])
@@ -677,18 +712,18 @@ Start splitting bills! 💰
         if expense_data.is_equal_split:
             split_details = f"💵 Each owes: ₹{equal_share:.2f}"
         else:
-            split_details = "💵 Split breakdown:\n"
-            for i, participant in enumerate(expense_data.participants):
-                user = telegram_users[i]
+            parts = ["💵 Split breakdown:\n"]
+            for participant in expense_data.participants:
                 paid_amount = participant.paid or 0
                 balance = paid_amount - equal_share
                 
                 if abs(balance) < 0.01:  # Settled
-                    split_details += f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (settled)\n"
+                    parts.append(f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (settled)\n")
                 elif balance > 0:  # Overpaid
-                    split_details += f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (gets back ₹{balance:.2f})\n"
+                    parts.append(f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (gets back ₹{balance:.2f})\n")
                 else:  # Underpaid
-                    split_details += f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (owes ₹{abs(balance):.2f})\n"
+                    parts.append(f"  • @{participant.username}: Paid ₹{paid_amount:.2f} (owes ₹{abs(balance):.2f})\n")
+            split_details = "".join(parts)
         
         message = f"""✅ *Expense Added!*
 
@@ -700,13 +735,115 @@ Start splitting bills! 💰
         
         await update.message.reply_text(message, parse_mode='Markdown')
     
+    def _load_expense_context(self, db, chat_id: int, chat_title: str, usernames: set):
+        """Get or create the group, returning (group id, group name, member ids,
+        {username: (user id, telegram id)} for the mentioned users)"""
+        group = db.query(Group).filter_by(telegram_chat_id=chat_id).first()
+        if not group:
+            group = Group(telegram_chat_id=chat_id, name=chat_title)
+            db.add(group)
+            db.commit()
+        
+        member_ids = {member.id for member in group.members}
+        users_by_username = {
+            username: (user_id, telegram_id)
+            for user_id, username, telegram_id in db.execute(
+                select(TelegramUser.id, TelegramUser.username, TelegramUser.telegram_id)
+                .where(TelegramUser.username.in_(usernames))
+            )
+        } if usernames else {}
+        return group.id, group.name, member_ids, users_by_username
+    
+    def _get_or_create_sender(self, db, group_id: int, sender: User) -> int:
+        """Get the message sender's user id, registering them in the group if they are new"""
+        user = db.query(TelegramUser).filter_by(telegram_id=sender.id).first()
+        if not user:
+            user = TelegramUser(
+                telegram_id=sender.id,
+                username=sender.username or f"user_{sender.id}",
+                first_name=sender.first_name,
+                last_name=sender.last_name
+            )
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            # Add to group if not already a member
+            group = db.get(Group, group_id)
+            if user not in group.members:
+                group.members.append(user)
+                db.commit()
+        return user.id
+    
+    def _remove_member(self, db, group_id: int, user_id: int):
+        """Remove a user who left the chat from our group membership"""
+        db.execute(
+            delete(group_members)
+            .where(group_members.c.group_id == group_id, group_members.c.user_id == user_id)
+        )
+        db.commit()
+    
+    def _add_admin_member(self, db, group_id: int, admin_user: User) -> int:
+        """Register a chat administrator and add them to the group, returning their user id"""
+        user = TelegramUser(
+            telegram_id=admin_user.id,
+            username=admin_user.username,
+            first_name=admin_user.first_name,
+            last_name=admin_user.last_name
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        # Add to group
+        group = db.get(Group, group_id)
+        group.members.append(user)
+        db.commit()
+        return user.id
+    
+    def _save_expense(self, db, group_id: int, expense_data: ExpenseData, user_ids: List[int],
+                      equal_share: float, created_by: int):
+        """Insert the expense and one split per participant"""
+        expense = Expense(
+            group_id=group_id,
+            amount=expense_data.total_amount,
+            description=expense_data.description,
+            created_by=created_by,
+            participant_count=len(user_ids)
+        )
+        db.add(expense)
+        db.flush()
+        
+        # Insert all splits as one multi-row INSERT, skipping per-object ORM bookkeeping
+        splits_data = []
+        for user_id, participant in zip(user_ids, expense_data.participants):
+            if expense_data.is_equal_split:
+                paid_amount = equal_share
+            else:
+                paid_amount = participant.paid or 0
+            
+            splits_data.append({
+                "expense_id": expense.id,
+                "user_id": user_id,
+                "paid_amount": paid_amount,
+                "owed_amount": equal_share
+            })
+        
+        db.execute(insert(Split), splits_data)
+        db.commit()
+    
     def run(self):
         """Start the bot"""
         # Initialize database
         init_db()
         
         # Create application
-        application = Application.builder().token(self.telegram_token).build()
+        # Give the HTTP client room past POLLING_TIMEOUT so it doesn't cut long polls short
+        application = (
+            Application.builder()
+            .token(self.telegram_token)
+            .get_updates_read_timeout(POLLING_TIMEOUT + 5)
+            .get_updates_connect_timeout(10)
+            .build()
+        )
         
         # Add handlers
         application.add_handler(CommandHandler("start", self.start))
@@ -723,20 +860,65 @@ Start splitting bills! 💰
         # Handle all text messages
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
-        # Start FastAPI in separate thread
-        def run_fastapi():
-            uvicorn.run(fastapi_app, host="0.0.0.0", port=8000)
-        
-        fastapi_thread = threading.Thread(target=run_fastapi, daemon=True)
-        fastapi_thread.start()
-        
         logger.info("Bot started!")
-        application.run_polling()
+        try:
+            # uvloop's libuv-based loop drives both Telegram polling and the API
+            uvloop.run(self._serve(application))
+        except KeyboardInterrupt:
+            # Interrupted before _serve installed its signal handlers
+            pass
+        logger.info("Bot stopped")
+    
+    async def _serve(self, application: Application):
+        """Run Telegram polling, and the FastAPI server on the same event loop unless it runs on its own"""
+        server = None
+        if settings.embed_api:
+            server = _EmbeddedServer(
+                uvicorn.Config(fastapi_app, host=settings.api_host, port=settings.api_port, http="httptools")
+            )
+        
+        stop = asyncio.Event()
+        
+        def request_stop():
+            stop.set()
+            if server is not None:
+                server.should_exit = True
+        
+        async with application:
+            await application.start()
+            await application.updater.start_polling(timeout=POLLING_TIMEOUT)
+            
+            # Same stop signals as Application.run_polling(); they only flag a stop so the
+            # cleanup below runs to completion instead of being cancelled mid-await.
+            # Installed once polling has started: until then nothing checks the flag, and
+            # the default handlers still interrupt a startup that is stuck
+            loop = asyncio.get_running_loop()
+            for sig in STOP_SIGNALS:
+                loop.add_signal_handler(sig, request_stop)
+            try:
+                if server is not None:
+                    # Serves the API until a stop signal sets should_exit
+                    await server.serve()
+                else:
+                    # The API runs in its own uvicorn workers; just poll until asked to exit
+                    await stop.wait()
+            finally:
+                # Stopping the updater also acknowledges the last fetched updates with
+                # Telegram, so they aren't delivered (and recorded) again on restart
+                await application.updater.stop()
+                await application.stop()
 
-if __name__ == "__main__":
-    # Set your tokens
-    TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "YOUR_TELEGRAM_BOT_TOKEN")
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY")
+
+class _EmbeddedServer(uvicorn.Server):
+    """uvicorn server that leaves signal handling to BillSplitBot._serve"""
     
-    bot = BillSplitBot(TELEGRAM_BOT_TOKEN, OPENAI_API_KEY)
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # uvicorn would replace the loop's handlers and re-raise the signal on exit,
+        # killing the process before the Telegram updater is stopped
+        yield
+
+
+if __name__ == "__main__":
+    bot = BillSplitBot(settings.telegram_bot_token, settings.openai_api_key)
     bot.run()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 from langchain_core.prompts import PromptTemplate
@@ -8,19 +8,8 @@ class ExpenseParticipant(BaseModel):
     paid: Optional[float] = Field(default=None, description="Amount paid by this user, None if not specified")
     
 class ExpenseData(BaseModel):
-    total_amount: float = Field(description="Total expense amount")
-    participants: List[ExpenseParticipant] = Field(description="List of participants in the expense")
+    # Constraints are declared on the fields so pydantic-core checks them without calling back into Python
+    total_amount: float = Field(gt=0, description="Total expense amount")
+    participants: List[ExpenseParticipant] = Field(min_length=2, description="List of participants in the expense")
     description: Optional[str] = Field(default="", description="Description of the expense")
-    is_equal_split: bool = Field(description="True if split equally, False if amounts are specified")
-    
-    @field_validator('participants')
-    def validate_participants(cls, v):
-        if len(v) < 2:
-            raise ValueError("At least 2 participants required")
-        return v
-    
-    @field_validator('total_amount')
-    def validate_amount(cls, v):
-        if v <= 0:
-            raise ValueError("Amount must be positive")
-        return v
\ No newline at end of file
+    is_equal_split: bool = Field(description="True if split equally, False if amounts are specified")
\ No newline at end of file
@@ -1,24 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, insert, func, and_, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from typing_extensions import TypedDict
 from datetime import datetime
+import heapq
+import msgspec
+from cachetools import TTLCache
 
+from settings import settings
 from group_database.database import get_db
 from group_database.models import TelegramUser, Group, Expense, Split
 
-app = FastAPI(title="Bill Split Bot API", version="1.0.0")
+# orjson serializes responses in C, straight to bytes
+app = FastAPI(title="Bill Split Bot API", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Users, groups and group summaries change rarely, so their responses are reused for
+# RESPONSE_CACHE_TTL seconds - the same window clients may cache them via Cache-Control
+RESPONSE_CACHE_TTL = 30
+CACHE_CONTROL = f"public, max-age={RESPONSE_CACHE_TTL}"
+response_cache = TTLCache(maxsize=512, ttl=RESPONSE_CACHE_TTL)
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress JSON responses (expense listings with splits run to tens of KB); tiny ones aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
 # Pydantic schemas for API
 class UserSchema(BaseModel):
     id: int
@@ -62,12 +82,45 @@ class ExpenseSchema(BaseModel):
     class Config:
         from_attributes = True
 
+# msgspec mirrors of SplitSchema/ExpenseSchema for hot list endpoints: encoded
+# straight to JSON bytes without Pydantic validating every field on the way out
+class SplitOut(msgspec.Struct):
+    id: int
+    user_id: int
+    paid_amount: float
+    owed_amount: float
+    is_settled: bool
+
+class ExpenseOut(msgspec.Struct):
+    id: int
+    group_id: int
+    amount: float
+    description: Optional[str]
+    created_by: int
+    created_at: datetime
+    splits: List[SplitOut]
+
+json_encoder = msgspec.json.Encoder()
+
+# A TypedDict validates to a plain dict, which is cheaper than a nested model per participant
+class ParticipantIn(TypedDict):
+    user_id: int
+    paid: float
+    owed: float
+
 class ExpenseCreateSchema(BaseModel):
     group_id: int
     amount: float
     description: Optional[str]
     created_by: int
-    participants: List[dict]  # [{"user_id": 1, "paid": 100, "owed": 50}]
+    participants: List[ParticipantIn]  # [{"user_id": 1, "paid": 100, "owed": 50}]
+
+# create_expense parses its body by hand, so its OpenAPI request body is spelled out
+# here, with the participant definition inlined since $defs aren't resolved in OpenAPI
+expense_create_json_schema = ExpenseCreateSchema.model_json_schema()
+expense_create_json_schema["properties"]["participants"]["items"] = (
+    expense_create_json_schema.pop("$defs")["ParticipantIn"]
+)
 
 class BalanceSchema(BaseModel):
     user_id: int
@@ -81,59 +134,112 @@ async def root():
     return {"message": "Bill Split Bot API", "version": "1.0.0"}
 
 @app.get("/users", response_model=List[UserSchema])
-async def get_users(db: Session = Depends(get_db)):
+async def get_users(response: Response, db: AsyncSession = Depends(get_db)):
     """Get all users"""
-    users = db.query(TelegramUser).all()
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    users = response_cache.get("users")
+    if users is None:
+        users = [UserSchema.model_validate(user) for user in await db.scalars(select(TelegramUser))]
+        response_cache["users"] = users
     return users
 
 @app.get("/users/{user_id}", response_model=UserSchema)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """Get user by ID"""
-    user = db.query(TelegramUser).filter(TelegramUser.id == user_id).first()
+    user = await db.get(TelegramUser, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @app.get("/groups", response_model=List[GroupSchema])
-async def get_groups(db: Session = Depends(get_db)):
+async def get_groups(response: Response, db: AsyncSession = Depends(get_db)):
     """Get all groups"""
-    groups = db.query(Group).all()
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    groups = response_cache.get("groups")
+    if groups is None:
+        groups = [GroupSchema.model_validate(group) for group in await db.scalars(select(Group))]
+        response_cache["groups"] = groups
     return groups
 
 @app.get("/groups/{group_id}", response_model=GroupSchema)
-async def get_group(group_id: int, db: Session = Depends(get_db)):
+async def get_group(group_id: int, db: AsyncSession = Depends(get_db)):
     """Get group by ID"""
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = await db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     return group
 
-@app.get("/groups/{group_id}/expenses", response_model=List[ExpenseSchema])
+# Documented as ExpenseSchema, but encoded with msgspec rather than validated by FastAPI
+@app.get("/groups/{group_id}/expenses", responses={200: {"model": List[ExpenseSchema]}})
 async def get_group_expenses(
     group_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get expenses for a group"""
-    expenses = db.query(Expense).filter(
-        Expense.group_id == group_id
-    ).order_by(Expense.created_at.desc()).offset(skip).limit(limit).all()
-    return expenses
+    # Load every listed expense's splits with one extra IN query
+    result = await db.scalars(
+        select(Expense)
+        .options(selectinload(Expense.splits))
+        .where(Expense.group_id == group_id)
+        .order_by(Expense.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    expenses = [
+        ExpenseOut(
+            id=expense.id,
+            group_id=expense.group_id,
+            amount=expense.amount,
+            description=expense.description,
+            created_by=expense.created_by,
+            created_at=expense.created_at,
+            splits=[
+                SplitOut(
+                    id=split.id,
+                    user_id=split.user_id,
+                    paid_amount=split.paid_amount,
+                    owed_amount=split.owed_amount,
+                    is_settled=split.is_settled,
+                )
+                for split in expense.splits
+            ],
+        )
+        for expense in result
+    ]
+    return Response(content=json_encoder.encode(expenses), media_type="application/json")
 
 @app.get("/expenses/{expense_id}", response_model=ExpenseSchema)
-async def get_expense(expense_id: int, db: Session = Depends(get_db)):
+async def get_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     """Get expense by ID"""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id, options=[selectinload(Expense.splits)])
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
-@app.post("/expenses", response_model=ExpenseSchema)
-async def create_expense(expense: ExpenseCreateSchema, db: Session = Depends(get_db)):
+@app.post(
+    "/expenses",
+    response_model=ExpenseSchema,
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": expense_create_json_schema}},
+            "required": True,
+        }
+    },
+)
+async def create_expense(request: Request, db: AsyncSession = Depends(get_db)):
     """Create a new expense"""
+    # Parse and validate the raw body in one pass instead of json.loads followed by validation
+    try:
+        expense = ExpenseCreateSchema.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+    
     # Validate group exists
-    group = db.query(Group).filter(Group.id == expense.group_id).first()
+    group = await db.get(Group, expense.group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
@@ -142,36 +248,45 @@ async def create_expense(expense: ExpenseCreateSchema, db: Session = Depends(get
         group_id=expense.group_id,
         amount=expense.amount,
         description=expense.description,
-        created_by=expense.created_by
+        created_by=expense.created_by,
+        participant_count=len(expense.participants)
     )
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
-    
-    # Create splits
-    for participant in expense.participants:
-        split = Split(
-            expense_id=db_expense.id,
-            user_id=participant["user_id"],
-            paid_amount=participant["paid"],
-            owed_amount=participant["owed"]
-        )
-        db.add(split)
-    
-    db.commit()
-    db.refresh(db_expense)
+    await db.flush()  # Assigns db_expense.id without ending the transaction
+    
+    # Create all splits with one multi-row INSERT
+    if expense.participants:
+        await db.execute(insert(Split), [
+            {
+                "expense_id": db_expense.id,
+                "user_id": participant["user_id"],
+                "paid_amount": participant["paid"],
+                "owed_amount": participant["owed"]
+            }
+            for participant in expense.participants
+        ])
+    
+    await db.commit()
+    response_cache.pop(("summary", expense.group_id), None)
+    
+    # Reload with the server-set created_at and the new splits for the response
+    db_expense = await db.get(
+        Expense, db_expense.id, options=[selectinload(Expense.splits)], populate_existing=True
+    )
     
     return db_expense
 
 @app.delete("/expenses/{expense_id}")
-async def delete_expense(expense_id: int, db: Session = Depends(get_db)):
+async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     """Delete an expense"""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    # The splits are deleted along with the expense, so load them with it
+    expense = await db.get(Expense, expense_id, options=[selectinload(Expense.splits)])
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    db.delete(expense)
-    db.commit()
+    await db.delete(expense)
+    await db.commit()
+    response_cache.pop(("summary", expense.group_id), None)
     
     return {"message": "Expense deleted successfully"}
 
@@ -179,97 +294,103 @@ async def delete_expense(expense_id: int, db: Session = Depends(get_db)):
 async def get_user_balances(
     user_id: int,
     group_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's balances with other users"""
-    user = db.query(TelegramUser).filter(TelegramUser.id == user_id).first()
+    user = await db.get(TelegramUser, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Calculate balances
-    balances = {}
-    
-    # Get all splits for this user
-    query = db.query(Split).join(Expense).join(Group)
+    # Each of my splits is shared among the expense's other participant_count - 1 participants
+    my_split = aliased(Split)
+    other_split = aliased(Split)
+    
+    # If I paid more than I owe, others owe me; if I paid less than I owe, I owe others
+    query = (
+        select(
+            TelegramUser.id.label("user_id"),
+            TelegramUser.username,
+            func.sum(
+                (my_split.paid_amount - my_split.owed_amount) / (Expense.participant_count - 1)
+            ).label("net_balance"),
+        )
+        .select_from(my_split)
+        .join(Expense, Expense.id == my_split.expense_id)
+        .join(other_split, and_(
+            other_split.expense_id == my_split.expense_id,
+            other_split.user_id != user_id,
+        ))
+        .join(TelegramUser, TelegramUser.id == other_split.user_id)
+        .where(my_split.user_id == user_id)
+        .group_by(TelegramUser.id, TelegramUser.username)
+        .order_by(TelegramUser.id)
+    )
     
     if group_id:
-        query = query.filter(Group.id == group_id)
+        query = query.where(Expense.group_id == group_id)
     
-    splits = query.filter(Split.user_id == user_id).all()
-    
-    for split in splits:
-        expense = split.expense
-        user_paid = split.paid_amount
-        user_owed = split.owed_amount
-        
-        # Calculate balance with each other participant
-        for other_split in expense.splits:
-            if other_split.user_id != user_id:
-                other_user = db.query(TelegramUser).get(other_split.user_id)
-                other_paid = other_split.paid_amount
-                other_owed = other_split.owed_amount
-                
-                # If I paid more than I owe, others owe me
-                # If I paid less than I owe, I owe others
-                my_net = user_paid - user_owed
-                
-                if other_user.id not in balances:
-                    balances[other_user.id] = {
-                        "user_id": other_user.id,
-                        "username": other_user.username,
-                        "net_balance": 0
-                    }
-                
-                # Simplify: if I overpaid and they underpaid, they owe me
-                balances[other_user.id]["net_balance"] += my_net / (len(expense.splits) - 1)
-    
-    return list(balances.values())
+    result = await db.execute(query)
+    return [row._asdict() for row in result]
 
 @app.get("/groups/{group_id}/summary")
-async def get_group_summary(group_id: int, db: Session = Depends(get_db)):
+async def get_group_summary(group_id: int, response: Response, db: AsyncSession = Depends(get_db)):
     """Get summary statistics for a group"""
-    group = db.query(Group).filter(Group.id == group_id).first()
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    summary = response_cache.get(("summary", group_id))
+    if summary is not None:
+        return summary
+    
+    group = await db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    expenses = db.query(Expense).filter(Expense.group_id == group_id).all()
+    # Count, total and average of the group's expenses, plus its distinct participants, in one query
+    participant_count = (
+        select(func.count(distinct(Split.user_id)))
+        .join(Expense, Expense.id == Split.expense_id)
+        .where(Expense.group_id == group_id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            func.count(Expense.id),
+            func.coalesce(func.sum(Expense.amount), 0),
+            func.coalesce(func.avg(Expense.amount), 0),
+            participant_count,
+        ).where(Expense.group_id == group_id)
+    )
+    total_expenses, total_amount, average_expense, participants = result.one()
     
-    if not expenses:
-        return {
+    if not total_expenses:
+        summary = {
             "group_id": group_id,
             "total_expenses": 0,
             "total_amount": 0,
             "average_expense": 0,
             "participant_count": 0
         }
+    else:
+        summary = {
+            "group_id": group_id,
+            "group_name": group.name,
+            "total_expenses": total_expenses,
+            "total_amount": total_amount,
+            "average_expense": average_expense,
+            "participant_count": participants
+        }
     
-    total_amount = sum(exp.amount for exp in expenses)
-    total_expenses = len(expenses)
-    
-    # Get unique participants
-    participants = set()
-    for exp in expenses:
-        for split in exp.splits:
-            participants.add(split.user_id)
-    
-    return {
-        "group_id": group_id,
-        "group_name": group.name,
-        "total_expenses": total_expenses,
-        "total_amount": total_amount,
-        "average_expense": total_amount / total_expenses,
-        "participant_count": len(participants)
-    }
+    response_cache[("summary", group_id)] = summary
+    return summary
 
 @app.put("/splits/{split_id}/settle")
-async def settle_split(split_id: int, db: Session = Depends(get_db)):
+async def settle_split(split_id: int, db: AsyncSession = Depends(get_db)):
     """Mark a split as settled"""
-    split = db.query(Split).filter(Split.id == split_id).first()
+    split = await db.get(Split, split_id)
     if not split:
         raise HTTPException(status_code=404, detail="Split not found")
     
     split.is_settled = True
-    db.commit()
+    await db.commit()
     
     return {"message": "Split marked as settled"}
 
@@ -279,65 +400,58 @@ async def health_check():
     return {"status": "healthy"}
 
 @app.get("/groups/{group_id}/simplify")
-async def simplify_group_debts(group_id: int, db: Session = Depends(get_db)):
+async def simplify_group_debts(group_id: int, db: AsyncSession = Depends(get_db)):
     """Get simplified debt settlement plan for a group"""
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = await db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Calculate net balance for each user
-    user_balances = {}
-    
-    expenses = db.query(Expense).filter_by(group_id=group_id).all()
-    
-    for expense in expenses:
-        for split in expense.splits:
-            user_id = split.user_id
-            if user_id not in user_balances:
-                user_balances[user_id] = 0
-            user_balances[user_id] += split.paid_amount - split.owed_amount
+    # Calculate net balance for each user: what they paid minus what they owe
+    result = await db.execute(
+        select(Split.user_id, TelegramUser.username, func.sum(Split.paid_amount - Split.owed_amount))
+        .join(Expense, Expense.id == Split.expense_id)
+        .join(TelegramUser, TelegramUser.id == Split.user_id)
+        .where(Expense.group_id == group_id)
+        .group_by(Split.user_id, TelegramUser.username)
+        .order_by(Split.user_id)
+    )
     
-    # Separate creditors and debtors
+    # Separate creditors and debtors into max-heaps keyed on the amount still
+    # outstanding (stored negated for heapq)
     creditors = []
     debtors = []
     
-    for user_id, balance in user_balances.items():
-        user = db.query(TelegramUser).get(user_id)
+    for user_id, username, balance in result:
         if balance > 0.01:
-            creditors.append({"user_id": user_id, "username": user.username, "amount": balance})
+            creditors.append((-balance, user_id, username))
         elif balance < -0.01:
-            debtors.append({"user_id": user_id, "username": user.username, "amount": -balance})
+            debtors.append((balance, user_id, username))
     
-    # Sort for optimal matching
-    creditors.sort(key=lambda x: x["amount"], reverse=True)
-    debtors.sort(key=lambda x: x["amount"], reverse=True)
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
     
-    # Greedy algorithm to minimize transactions
+    # Greedy algorithm to minimize transactions: always settle the largest
+    # debtor against the largest creditor
     transactions = []
-    i, j = 0, 0
     
-    while i < len(debtors) and j < len(creditors):
-        debtor = debtors[i]
-        creditor = creditors[j]
-        
-        amount = min(debtor["amount"], creditor["amount"])
-        
-        if amount > 0.01:
-            transactions.append({
-                "from_user_id": debtor["user_id"],
-                "from_username": debtor["username"],
-                "to_user_id": creditor["user_id"],
-                "to_username": creditor["username"],
-                "amount": round(amount, 2)
-            })
+    while debtors and creditors:
+        debt, debtor_id, debtor_name = heapq.heappop(debtors)
+        credit, creditor_id, creditor_name = heapq.heappop(creditors)
         
-        debtor["amount"] -= amount
-        creditor["amount"] -= amount
+        amount = min(-debt, -credit)
+        transactions.append({
+            "from_user_id": debtor_id,
+            "from_username": debtor_name,
+            "to_user_id": creditor_id,
+            "to_username": creditor_name,
+            "amount": round(amount, 2)
+        })
         
-        if debtor["amount"] < 0.01:
-            i += 1
-        if creditor["amount"] < 0.01:
-            j += 1
+        # Push back whoever still has a meaningful amount left
+        if -debt - amount > 0.01:
+            heapq.heappush(debtors, (debt + amount, debtor_id, debtor_name))
+        if -credit - amount > 0.01:
+            heapq.heappush(creditors, (credit + amount, creditor_id, creditor_name))
     
     return {
         "group_id": group_id,
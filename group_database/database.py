@@ -1,50 +1,136 @@
 import os
-from sqlalchemy import create_engine
+from uuid import uuid4
+from sqlalchemy import create_engine, event, inspect, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
+
+from settings import settings
 
 # Database URL - supports both SQLite and PostgreSQL
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./billsplit.db")
+DATABASE_URL = settings.database_url
 
 # Connection arguments based on database type
 connect_args = {}
-engine_kwargs = {}
+async_connect_args = {}
+
+# Reuse connections across bot handlers and API requests instead of reconnecting each time
+pool_kwargs = {
+    "pool_size": settings.db_pool_size,  # Number of connections to maintain
+    "max_overflow": settings.db_max_overflow,  # Additional connections if pool is full
+    "pool_timeout": 30,  # Seconds to wait for a free connection
+    "pool_pre_ping": True,  # Test connections before using
+    "pool_recycle": 3600,  # Recycle connections after 1 hour
+}
 
 if "sqlite" in DATABASE_URL:
-    connect_args = {"check_same_thread": False}
-elif "postgresql" in DATABASE_URL:
-    # PostgreSQL specific optimizations
-    engine_kwargs = {
-        "pool_size": 10,  # Number of connections to maintain
-        "max_overflow": 20,  # Additional connections if pool is full
-        "pool_pre_ping": True,  # Test connections before using
-        "pool_recycle": 3600,  # Recycle connections after 1 hour
+    # Wait up to 30s for the write lock instead of failing with "database is locked"
+    connect_args = {"check_same_thread": False, "timeout": 30}
+    async_connect_args = connect_args
+elif settings.use_pgbouncer:
+    # Consecutive transactions may run on different server connections behind PgBouncer,
+    # so server-side prepared statements can't be reused (or even found) between them
+    if make_url(DATABASE_URL).get_driver_name() == "psycopg":
+        connect_args = {"prepare_threshold": None}
+    async_connect_args = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
     }
 
-# Create engine
+# Create engine (used by the bot, which runs its queries in worker threads)
 engine = create_engine(
     DATABASE_URL, 
     connect_args=connect_args,
-    **engine_kwargs
+    poolclass=QueuePool,
+    **pool_kwargs
+)
+
+# Same database through an asyncio driver, for the FastAPI endpoints
+db_url = make_url(DATABASE_URL)
+if db_url.get_backend_name() == "sqlite":
+    ASYNC_DATABASE_URL = db_url.set(drivername="sqlite+aiosqlite")
+else:
+    # asyncpg rejects libpq-only query parameters, so hand sslmode over as its ssl argument
+    async_query = dict(db_url.query)
+    sslmode = async_query.pop("sslmode", None)
+    if sslmode:
+        async_connect_args = {**async_connect_args, "ssl": sslmode}
+    ASYNC_DATABASE_URL = db_url.set(drivername="postgresql+asyncpg", query=async_query)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args,
+    **pool_kwargs
 )
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets API reads run alongside bot writes instead of queueing on the file lock"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit, since reloading expired attributes would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
 
+# Alembic config at the project root; migrations live in migrations/versions
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def _unversioned_revision(conn):
+    """Revision matching a database created with create_all before migrations existed, if any"""
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+    if "telegram_users" not in tables:
+        return None  # Empty database; migrations create everything
+    if "group_members" not in tables:
+        return "2e5efa4ec6b4"  # initial schema
+    if "ix_splits_user_expense" not in {index["name"] for index in inspector.get_indexes("splits")}:
+        return "d65b1873ee4d"  # add group_members
+    return "86abfd82095f"  # add composite indexes
+
 def init_db():
-    """Initialize database and create all tables"""
-    from group_database.models import TelegramUser, Group, Expense, Split
-    Base.metadata.create_all(bind=engine)
+    """Initialize database and apply any pending migrations"""
+    from alembic import command
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    
+    config = Config(ALEMBIC_INI)
+    # Keep env.py from reconfiguring the bot's logging
+    config.attributes["configure_logger"] = False
+    
+    with engine.connect() as conn:
+        if MigrationContext.configure(conn).get_current_revision() is None:
+            revision = _unversioned_revision(conn)
+        else:
+            revision = None
+    if revision:
+        command.stamp(config, revision)
+    
+    command.upgrade(config, "head")
     print(f"Database initialized: {DATABASE_URL}")
 
-def get_db():
+def dialect_insert(table):
+    """Build an INSERT supporting ON CONFLICT clauses for the configured database"""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+async def get_db():
     """Dependency for FastAPI to get database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -1,14 +1,13 @@
 """
 Migration script to convert Integer columns to BigInteger for Telegram IDs
 Run this script to fix the integer overflow issue
+Run this from the project root: python3 -m group_database.migrate_db
 """
-import os
 from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
 
-load_dotenv()
+from settings import settings
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./splitwise_bot.db")
+DATABASE_URL = settings.database_url
 
 def migrate_postgres():
     """Migrate PostgreSQL database"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Boolean, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Boolean, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from group_database.database import Base
@@ -40,12 +40,17 @@ class Group(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Group listings filter by group and order by newest first
+        Index("ix_expenses_group_created", "group_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     group_id = Column(Integer, ForeignKey("groups.id"))
     amount = Column(Float)
     description = Column(String, nullable=True)
     created_by = Column(BigInteger)  # Telegram user ID who created the expense
+    participant_count = Column(Integer, nullable=False, server_default="0")  # Number of splits, stored to avoid counting them
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -54,6 +59,11 @@ class Expense(Base):
 
 class Split(Base):
     __tablename__ = "splits"
+    __table_args__ = (
+        # Joining an expense's splits, and finding a user's splits per expense
+        Index("ix_splits_expense_user", "expense_id", "user_id"),
+        Index("ix_splits_user_expense", "user_id", "expense_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     expense_id = Column(Integer, ForeignKey("expenses.id"))
@@ -0,0 +1,38 @@
+"""add composite indexes
+
+Group expense listings filter by group and order by created_at; balance
+queries join splits by expense and look up a user's splits.
+
+Revision ID: 86abfd82095f
+Revises: d65b1873ee4d
+Create Date: 2026-10-15 09:52:58.907631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '86abfd82095f'
+down_revision: Union[str, Sequence[str], None] = 'd65b1873ee4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY doesn't lock out writes on PostgreSQL, but can't
+    # run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_group_created', 'expenses', ['group_id', 'created_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_splits_expense_user', 'splits', ['expense_id', 'user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_splits_user_expense', 'splits', ['user_id', 'expense_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_splits_user_expense', table_name='splits')
+    op.drop_index('ix_splits_expense_user', table_name='splits')
+    op.drop_index('ix_expenses_group_created', table_name='expenses')
@@ -0,0 +1,37 @@
+"""add expenses.participant_count
+
+Balance queries divide each split by the expense's other participants;
+storing the count saves counting splits per expense at query time.
+
+Revision ID: bf0a718e6ec7
+Revises: 86abfd82095f
+Create Date: 2026-10-15 10:05:12.663041
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf0a718e6ec7'
+down_revision: Union[str, Sequence[str], None] = '86abfd82095f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('expenses', sa.Column('participant_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill existing expenses from their splits
+    op.execute(
+        "UPDATE expenses SET participant_count = "
+        "(SELECT count(*) FROM splits WHERE splits.expense_id = expenses.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_column('participant_count')
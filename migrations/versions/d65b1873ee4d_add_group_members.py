@@ -0,0 +1,38 @@
+"""add group_members
+
+Tracks which users belong to which groups, so only members of a group
+can be included in its expenses.
+
+Revision ID: d65b1873ee4d
+Revises: 2e5efa4ec6b4
+Create Date: 2026-10-15 09:52:31.540172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd65b1873ee4d'
+down_revision: Union[str, Sequence[str], None] = '2e5efa4ec6b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('group_members',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['telegram_users.id'], ),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('group_members')
@@ -0,0 +1,36 @@
+"""
+Application settings, read once from the environment and .env at import
+"""
+
+from typing import List
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    
+    # Telegram Bot Configuration
+    telegram_bot_token: str = "YOUR_TELEGRAM_BOT_TOKEN"
+    
+    # OpenAI Configuration
+    openai_api_key: str = "YOUR_OPENAI_API_KEY"
+    
+    # Database URL - supports both SQLite and PostgreSQL. The API derives an asyncpg URL
+    # from it: ?sslmode= is passed on as asyncpg's ssl mode, other libpq-only query
+    # parameters aren't understood by asyncpg and belong in PG* environment variables
+    database_url: str = "sqlite:///./billsplit.db"
+    # Set when database_url points at PgBouncer in transaction pooling mode
+    use_pgbouncer: bool = False
+    # Connections kept (and allowed on top) per process; lower these when running several API workers
+    db_pool_size: int = 20
+    db_max_overflow: int = 30
+    
+    # FastAPI Configuration
+    # Serve the API from the bot process; disable when running it with separate uvicorn workers
+    embed_api: bool = True
+    api_host: str = "0.0.0.0"
+    api_port: int = 8000
+    # Origins allowed to call the API from a browser, as a JSON list
+    cors_origins: List[str] = ["*"]
+
+settings = Settings()
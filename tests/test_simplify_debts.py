@@ -2,6 +2,63 @@
 Test script to verify the debt simplification algorithm
 """
 
+import sys
+from collections import defaultdict, deque
+from math import fsum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # Numba is optional; the matching loop then runs as plain Python
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+# Report decorations, built once at import
+_BAR = "=" * 70
+_OK = "✅"
+_FAIL = "❌"
+_SCALE = "⚖️"
+_WARN = "⚠️"
+
+
+@njit(cache=True)
+def _greedy_match(debt_amts, cred_amts, out_from, out_to, out_amt):
+    """
+    Match debtors to creditors (both sorted largest first, in cents) in place.
+    
+    Writes debtor index, creditor index and amount of each transaction into
+    the output buffers and returns how many transactions were written.
+    """
+    i = j = k = 0
+    while i < len(debt_amts) and j < len(cred_amts):
+        # Amount to settle
+        a = debt_amts[i] if debt_amts[i] < cred_amts[j] else cred_amts[j]
+        
+        if a > 0:
+            out_from[k] = i
+            out_to[k] = j
+            out_amt[k] = a
+            k += 1
+        
+        # Update remaining amounts
+        debt_amts[i] -= a
+        cred_amts[j] -= a
+        
+        # Move to next if settled
+        if debt_amts[i] == 0:
+            i += 1
+        if cred_amts[j] == 0:
+            j += 1
+    return k
+
+
 def simplify_debts(balances):
     """
     Simplify debts using greedy algorithm to minimize transactions
@@ -12,232 +69,287 @@ def simplify_debts(balances):
                  negative = debtor (should pay)
     
     Returns:
-        List of transactions: [{"from": username, "to": username, "amount": float}]
+        List of transactions: [(from_username, to_username, amount)]
+    
+    Raises:
+        ValueError: if the balances don't sum to zero
     """
-    # Separate creditors and debtors
-    creditors = []  # People who should receive money
-    debtors = []    # People who should pay money
+    # Malformed input can't be settled; bail out before sorting anything
+    total = fsum(balances.values())
+    if abs(total) > 0.01:
+        raise ValueError(f"Balances don't add up: sum is {total:.2f}")
+    
+    # Separate creditors and debtors into parallel username/amount lists,
+    # working in whole cents so settled amounts compare exactly against zero
+    cred_users, cred_amts = [], []  # People who should receive money
+    debt_users, debt_amts = [], []  # People who should pay money
     
     for username, balance in balances.items():
-        if balance > 0.01:  # Creditor
-            creditors.append({"username": username, "amount": balance})
-        elif balance < -0.01:  # Debtor
-            debtors.append({"username": username, "amount": -balance})
+        cents = int(round(balance * 100))
+        if cents > 0:  # Creditor
+            cred_users.append(username)
+            cred_amts.append(cents)
+        elif cents < 0:  # Debtor
+            debt_users.append(username)
+            debt_amts.append(-cents)
     
-    # Sort for optimal matching (largest first)
-    creditors.sort(key=lambda x: x["amount"], reverse=True)
-    debtors.sort(key=lambda x: x["amount"], reverse=True)
+    # Fast paths: nothing to settle, or a single debtor paying a single creditor
+    if not debt_amts or not cred_amts:
+        return []
+    if len(debt_amts) == 1 and len(cred_amts) == 1:
+        return [(debt_users[0], cred_users[0], min(debt_amts[0], cred_amts[0]) / 100.0)]
     
-    # Greedy algorithm to minimize transactions
+    # Pair off debtors who owe exactly what some creditor is owed; each such
+    # pair settles in one transaction and drops out of the greedy pass
     transactions = []
-    i, j = 0, 0
+    cred_by_amt = defaultdict(deque)
+    for k, amt in enumerate(cred_amts):
+        cred_by_amt[amt].append(k)
+    matched_cred = set()
+    rest_users, rest_amts = [], []
+    for username, amt in zip(debt_users, debt_amts):
+        waiting = cred_by_amt.get(amt)
+        if waiting:
+            k = waiting.popleft()
+            matched_cred.add(k)
+            transactions.append((username, cred_users[k], amt / 100.0))
+        else:
+            rest_users.append(username)
+            rest_amts.append(amt)
+    debt_users, debt_amts = rest_users, rest_amts
+    if matched_cred:
+        cred_users = [u for k, u in enumerate(cred_users) if k not in matched_cred]
+        cred_amts = [a for k, a in enumerate(cred_amts) if k not in matched_cred]
     
-    while i < len(debtors) and j < len(creditors):
-        debtor = debtors[i]
-        creditor = creditors[j]
-        
-        # Amount to settle
-        amount = min(debtor["amount"], creditor["amount"])
-        
-        if amount > 0.01:  # Only add if meaningful
-            transactions.append({
-                "from": debtor["username"],
-                "to": creditor["username"],
-                "amount": round(amount, 2)
-            })
-        
-        # Update remaining amounts
-        debtor["amount"] -= amount
-        creditor["amount"] -= amount
-        
-        # Move to next if settled
-        if debtor["amount"] < 0.01:
-            i += 1
-        if creditor["amount"] < 0.01:
-            j += 1
+    # Sort for optimal matching (largest first) by index, then permute both lists
+    order = sorted(range(len(cred_amts)), key=cred_amts.__getitem__, reverse=True)
+    cred_amts = [cred_amts[k] for k in order]
+    cred_users = [cred_users[k] for k in order]
+    order = sorted(range(len(debt_amts)), key=debt_amts.__getitem__, reverse=True)
+    debt_amts = [debt_amts[k] for k in order]
+    debt_users = [debt_users[k] for k in order]
+    
+    # Greedy algorithm to minimize transactions; each step settles at least
+    # one person, so there are never more transactions than people
+    size = len(debt_amts) + len(cred_amts)
+    if HAS_NUMBA:
+        debt_amts = np.array(debt_amts, dtype=np.int64)
+        cred_amts = np.array(cred_amts, dtype=np.int64)
+        out_from = np.empty(size, dtype=np.int64)
+        out_to = np.empty(size, dtype=np.int64)
+        out_amt = np.empty(size, dtype=np.int64)
+    else:
+        out_from, out_to, out_amt = [0] * size, [0] * size, [0] * size
+    
+    k = _greedy_match(debt_amts, cred_amts, out_from, out_to, out_amt)
+    
+    transactions.extend(
+        (debt_users[out_from[t]], cred_users[out_to[t]], int(out_amt[t]) / 100.0)
+        for t in range(k)
+    )
     
     return transactions
 
 
 def print_test_result(test_name, balances, expected_txn_count=None):
     """Print test results in a readable format"""
-    print("=" * 70)
-    print(f"TEST: {test_name}")
-    print("=" * 70)
+    buf = []
+    buf.append(f"{_BAR}\n")
+    buf.append(f"TEST: {test_name}\n")
+    buf.append(f"{_BAR}\n")
     
-    print("\n📊 Initial Balances:")
+    buf.append("\n📊 Initial Balances:\n")
     total_positive = 0
     total_negative = 0
     
     for username, balance in balances.items():
         if balance > 0:
-            print(f"  ✅ @{username}: +₹{balance:.2f} (should receive)")
+            buf.append(f"  {_OK} @{username}: +₹{balance:.2f} (should receive)\n")
             total_positive += balance
         elif balance < 0:
-            print(f"  ❌ @{username}: -₹{abs(balance):.2f} (should pay)")
+            buf.append(f"  {_FAIL} @{username}: -₹{abs(balance):.2f} (should pay)\n")
             total_negative += abs(balance)
         else:
-            print(f"  ⚖️  @{username}: ₹0.00 (settled)")
+            buf.append(f"  {_SCALE}  @{username}: ₹0.00 (settled)\n")
     
-    print(f"\n  Total to receive: ₹{total_positive:.2f}")
-    print(f"  Total to pay: ₹{total_negative:.2f}")
-    print(f"  Balanced: {abs(total_positive - total_negative) < 0.01} ✓" if abs(total_positive - total_negative) < 0.01 else f"  ⚠️  WARNING: Not balanced!")
+    buf.append(f"\n  Total to receive: ₹{total_positive:.2f}\n")
+    buf.append(f"  Total to pay: ₹{total_negative:.2f}\n")
+    buf.append(f"  Balanced: {abs(total_positive - total_negative) < 0.01} ✓\n" if abs(total_positive - total_negative) < 0.01 else f"  {_WARN}  WARNING: Not balanced!\n")
     
-    transactions = simplify_debts(balances)
+    try:
+        transactions = simplify_debts(balances)
+    except ValueError as e:
+        buf.append(f"\n{_FAIL} ERROR: {e}\n\n")
+        sys.stdout.write("".join(buf))
+        return
     
-    print(f"\n💸 Simplified Payment Plan ({len(transactions)} transaction(s)):")
+    buf.append(f"\n💸 Simplified Payment Plan ({len(transactions)} transaction(s)):\n")
     if not transactions:
-        print("  🎉 Everyone is settled up! No payments needed.")
+        buf.append("  🎉 Everyone is settled up! No payments needed.\n")
     else:
-        for i, txn in enumerate(transactions, 1):
-            print(f"  {i}. @{txn['from']} pays @{txn['to']}: ₹{txn['amount']:.2f}")
+        for i, (frm, to, amt) in enumerate(transactions, 1):
+            buf.append(f"  {i}. @{frm} pays @{to}: ₹{amt:.2f}\n")
     
     # Verify the solution
-    print("\n🔍 Verification:")
-    final_balances = {username: balance for username, balance in balances.items()}
-    
-    for txn in transactions:
-        final_balances[txn['from']] += txn['amount']
-        final_balances[txn['to']] -= txn['amount']
-    
-    all_settled = all(abs(balance) < 0.01 for balance in final_balances.values())
+    buf.append("\n🔍 Verification:\n")
+    if np is not None:
+        # Scatter-add every transaction into one balance vector
+        idx_of = {username: k for k, username in enumerate(balances)}
+        final = np.fromiter(balances.values(), dtype=np.float64, count=len(balances))
+        if transactions:
+            from_idx = np.array([idx_of[t[0]] for t in transactions], dtype=np.intp)
+            to_idx = np.array([idx_of[t[1]] for t in transactions], dtype=np.intp)
+            amts = np.array([t[2] for t in transactions], dtype=np.float64)
+            np.add.at(final, from_idx, amts)
+            np.add.at(final, to_idx, -amts)
+        all_settled = bool(np.all(np.abs(final) < 0.01))
+        final_balances = dict(zip(balances, final.tolist()))
+    else:
+        final_balances = dict(balances)
+        for frm, to, amt in transactions:
+            final_balances[frm] += amt
+            final_balances[to] -= amt
+        all_settled = all(abs(balance) < 0.01 for balance in final_balances.values())
     
     if all_settled:
-        print("  ✅ All debts settled correctly!")
+        buf.append(f"  {_OK} All debts settled correctly!\n")
     else:
-        print("  ❌ ERROR: Some debts remain!")
+        buf.append(f"  {_FAIL} ERROR: Some debts remain!\n")
         for username, balance in final_balances.items():
             if abs(balance) > 0.01:
-                print(f"     @{username}: ₹{balance:.2f}")
+                buf.append(f"     @{username}: ₹{balance:.2f}\n")
     
     if expected_txn_count is not None:
         if len(transactions) == expected_txn_count:
-            print(f"  ✅ Transaction count matches expected: {expected_txn_count}")
+            buf.append(f"  {_OK} Transaction count matches expected: {expected_txn_count}\n")
         else:
-            print(f"  ⚠️  Expected {expected_txn_count} transactions, got {len(transactions)}")
-    
-    print()
-
-
-# Test Case 1: Simple two-person debt
-print_test_result(
-    "Simple Two-Person Debt",
-    balances={
-        "alice": 100,    # Alice should receive ₹100
-        "bob": -100      # Bob should pay ₹100
-    },
-    expected_txn_count=1
-)
-
-# Test Case 2: Three people in a chain
-print_test_result(
-    "Three-Person Chain",
-    balances={
-        "alice": 150,    # Alice should receive ₹150
-        "bob": -50,      # Bob should pay ₹50
-        "charlie": -100  # Charlie should pay ₹100
-    },
-    expected_txn_count=2
-)
-
-# Test Case 3: Complex scenario - multiple creditors and debtors
-print_test_result(
-    "Complex Multi-Person Scenario",
-    balances={
-        "alice": 200,    # Alice paid ₹200 extra
-        "bob": 100,      # Bob paid ₹100 extra
-        "charlie": -150, # Charlie owes ₹150
-        "david": -150    # David owes ₹150
-    },
-    expected_txn_count=3  # Optimal: 3 transactions instead of 4
-)
-
-# Test Case 4: Everyone is settled
-print_test_result(
-    "Everyone Settled",
-    balances={
-        "alice": 0,
-        "bob": 0,
-        "charlie": 0
-    },
-    expected_txn_count=0
-)
-
-# Test Case 5: One person paid everything
-print_test_result(
-    "One Person Paid Everything",
-    balances={
-        "alice": 300,    # Alice paid for everyone
-        "bob": -100,     # Bob owes his share
-        "charlie": -100, # Charlie owes his share
-        "david": -100    # David owes his share
-    },
-    expected_txn_count=3
-)
-
-# Test Case 6: Real-world scenario
-print_test_result(
-    "Real-World Dinner Scenario",
-    balances={
-        "alice": 450,    # Alice paid ₹900 (bill + tip), owes ₹450
-        "bob": -150,     # Bob paid ₹300, owes ₹450
-        "charlie": 0,    # Charlie paid ₹450, owes ₹450 (settled)
-        "david": -300    # David paid ₹150, owes ₹450
-    },
-    expected_txn_count=2
-)
-
-# Test Case 7: Circular debt scenario
-print_test_result(
-    "Circular Debt Pattern",
-    balances={
-        "alice": 50,
-        "bob": 100,
-        "charlie": -75,
-        "david": -75
-    },
-    expected_txn_count=3
-)
-
-# Test Case 8: Large group with various amounts
-print_test_result(
-    "Large Group (6 people)",
-    balances={
-        "alice": 250,
-        "bob": 150,
-        "charlie": -100,
-        "david": -150,
-        "eve": -50,
-        "frank": -100
-    },
-    expected_txn_count=5  # Optimized from potential 10+ transactions
-)
-
-# Test Case 9: Floating point precision test
-print_test_result(
-    "Floating Point Precision",
-    balances={
-        "alice": 33.33,
-        "bob": 33.34,
-        "charlie": -66.67
-    },
-    expected_txn_count=2
-)
-
-# Test Case 10: Everyone owes one person
-print_test_result(
-    "Everyone Owes One Person",
-    balances={
-        "alice": 1000,   # Alice paid for entire group
-        "bob": -200,
-        "charlie": -200,
-        "david": -200,
-        "eve": -200,
-        "frank": -200
-    },
-    expected_txn_count=5
-)
-
-print("=" * 70)
-print("✨ All tests completed!")
-print("=" * 70)
+            buf.append(f"  {_WARN}  Expected {expected_txn_count} transactions, got {len(transactions)}\n")
+    
+    buf.append("\n")
+    
+    sys.stdout.write("".join(buf))
+
+
+if __name__ == "__main__":
+    # Test Case 1: Simple two-person debt
+    print_test_result(
+        "Simple Two-Person Debt",
+        balances={
+            "alice": 100,    # Alice should receive ₹100
+            "bob": -100      # Bob should pay ₹100
+        },
+        expected_txn_count=1
+    )
+
+    # Test Case 2: Three people in a chain
+    print_test_result(
+        "Three-Person Chain",
+        balances={
+            "alice": 150,    # Alice should receive ₹150
+            "bob": -50,      # Bob should pay ₹50
+            "charlie": -100  # Charlie should pay ₹100
+        },
+        expected_txn_count=2
+    )
+
+    # Test Case 3: Complex scenario - multiple creditors and debtors
+    print_test_result(
+        "Complex Multi-Person Scenario",
+        balances={
+            "alice": 200,    # Alice paid ₹200 extra
+            "bob": 100,      # Bob paid ₹100 extra
+            "charlie": -150, # Charlie owes ₹150
+            "david": -150    # David owes ₹150
+        },
+        expected_txn_count=3  # Optimal: 3 transactions instead of 4
+    )
+
+    # Test Case 4: Everyone is settled
+    print_test_result(
+        "Everyone Settled",
+        balances={
+            "alice": 0,
+            "bob": 0,
+            "charlie": 0
+        },
+        expected_txn_count=0
+    )
+
+    # Test Case 5: One person paid everything
+    print_test_result(
+        "One Person Paid Everything",
+        balances={
+            "alice": 300,    # Alice paid for everyone
+            "bob": -100,     # Bob owes his share
+            "charlie": -100, # Charlie owes his share
+            "david": -100    # David owes his share
+        },
+        expected_txn_count=3
+    )
+
+    # Test Case 6: Real-world scenario
+    print_test_result(
+        "Real-World Dinner Scenario",
+        balances={
+            "alice": 450,    # Alice paid ₹900 (bill + tip), owes ₹450
+            "bob": -150,     # Bob paid ₹300, owes ₹450
+            "charlie": 0,    # Charlie paid ₹450, owes ₹450 (settled)
+            "david": -300    # David paid ₹150, owes ₹450
+        },
+        expected_txn_count=2
+    )
+
+    # Test Case 7: Circular debt scenario
+    print_test_result(
+        "Circular Debt Pattern",
+        balances={
+            "alice": 50,
+            "bob": 100,
+            "charlie": -75,
+            "david": -75
+        },
+        expected_txn_count=3
+    )
+
+    # Test Case 8: Large group with various amounts
+    print_test_result(
+        "Large Group (6 people)",
+        balances={
+            "alice": 250,
+            "bob": 150,
+            "charlie": -100,
+            "david": -150,
+            "eve": -50,
+            "frank": -100
+        },
+        expected_txn_count=5  # Optimized from potential 10+ transactions
+    )
+
+    # Test Case 9: Floating point precision test
+    print_test_result(
+        "Floating Point Precision",
+        balances={
+            "alice": 33.33,
+            "bob": 33.34,
+            "charlie": -66.67
+        },
+        expected_txn_count=2
+    )
+
+    # Test Case 10: Everyone owes one person
+    print_test_result(
+        "Everyone Owes One Person",
+        balances={
+            "alice": 1000,   # Alice paid for entire group
+            "bob": -200,
+            "charlie": -200,
+            "david": -200,
+            "eve": -200,
+            "frank": -200
+        },
+        expected_txn_count=5
+    )
+
+    print(_BAR)
+    print("✨ All tests completed!")
+    print(_BAR)
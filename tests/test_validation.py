@@ -2,40 +2,45 @@
 Test script to show the validation logic
 """
 
+from math import fsum
+
+
 def validate_unequal_split(expense_data):
     """Simulate the validation logic"""
     
-    # Check that all participants have paid amounts specified
-    missing_amounts = []
-    for participant in expense_data['participants']:
-        if participant['paid'] is None:
-            missing_amounts.append(participant['username'])
+    parts = expense_data['participants']
+    total = expense_data['total_amount']
     
-    if missing_amounts:
+    # Check that all participants have paid amounts specified; the names are
+    # only collected once we know something is missing
+    if any(p['paid'] is None for p in parts):
+        missing_amounts = [p['username'] for p in parts if p['paid'] is None]
         users_str = ", ".join([f"@{u}" for u in missing_amounts])
         print(f"❌ ERROR: For unequal split, all participants must specify how much they paid.")
         print(f"   Missing amounts for: {users_str}\n")
         return False
     
-    # Calculate total paid
-    total_paid = sum(p['paid'] for p in expense_data['participants'])
+    # Calculate total paid (correctly rounded, so no drift across many participants)
+    total_paid = fsum(p['paid'] for p in parts)
     
-    # Validate that total paid equals total amount
-    if abs(total_paid - expense_data['total_amount']) > 0.01:
+    # Validate that total paid equals total amount (to the nearest paisa)
+    if abs(total_paid - total) > 0.005:
         # Build detailed breakdown for error message
-        breakdown = "\n".join([f"  • @{p['username']}: ₹{p['paid']:.2f}" for p in expense_data['participants']])
+        breakdown = "\n".join(f"  • @{p['username']}: ₹{p['paid']:.2f}" for p in parts)
         print(
             f"❌ ERROR: The amounts don't add up!\n"
-            f"   Total expense: ₹{expense_data['total_amount']:.2f}\n"
+            f"   Total expense: ₹{total:.2f}\n"
             f"   Total paid: ₹{total_paid:.2f}\n"
-            f"   Difference: ₹{abs(total_paid - expense_data['total_amount']):.2f}\n\n"
+            f"   Difference: ₹{abs(total_paid - total):.2f}\n\n"
             f"   Breakdown:\n{breakdown}\n"
         )
         return False
     
-    print(f"✅ SUCCESS: Validation passed!")
-    print(f"   Total: ₹{expense_data['total_amount']:.2f}")
-    print(f"   Paid amounts add up correctly\n")
+    print(
+        f"✅ SUCCESS: Validation passed!\n"
+        f"   Total: ₹{total:.2f}\n"
+        f"   Paid amounts add up correctly\n"
+    )
     return True
 
 